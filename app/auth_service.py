@@ -1,27 +1,93 @@
+import asyncio
+import hashlib
 import os
-from datetime import datetime, timezone, timedelta
+import time
+from dataclasses import dataclass
+from datetime import timedelta
 from typing import Annotated
 
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, ExpiredSignatureError, JWTError
+import jwt
 from passlib.context import CryptContext
 
 from app.database.db_session import get_db
-from app.models.user import User
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Header
 
 SECRET_KEY = os.getenv("SECRET_KEY")
+_SECRET_BYTES = SECRET_KEY.encode() if SECRET_KEY else None  # Кодируем ключ один раз, а не на каждый токен
 ALGORITHM = 'HS256'
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+pwd_context = CryptContext(
+    schemes=['argon2', 'bcrypt'],  # Новые пароли хэшируются Argon2id, старые bcrypt-хэши проверяются как раньше
+    deprecated='auto',
+    argon2__type='ID',
+    argon2__time_cost=2,
+    argon2__memory_cost=19 * 1024,
+    argon2__parallelism=1,
+    bcrypt__rounds=12
+)
+_USER_BY_NAME_SQL = "SELECT id, name, password, role, is_admin FROM users WHERE name = $1"
+PENDING_PASSWORD_HASH = '!'  # Заглушка, пока хэш пароля считается в фоне; ни с одним паролем не совпадает
+PENDING_REGISTRATION_TTL = timedelta(minutes=10)  # После этого незавершенная регистрация считается брошенной
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """
+    Данные текущего пользователя, извлеченные из токена.
+    """
+    username: str
+    id: int
+    is_admin: bool
+
+
+TOKEN_CACHE_TTL = 60  # Сколько секунд хранить декодированный токен
+TOKEN_CACHE_MAXSIZE = 4096
+_TOKEN_CACHE: dict[bytes, tuple[dict, float]] = {}
+
+
+def _decode_token(token: str) -> dict:
+    """
+    Декодирует JWT, используя кэш уже проверенных токенов.
+    Ключ кэша - хэш токена, запись живет не дольше TOKEN_CACHE_TTL
+    и не дольше срока действия самого токена.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _TOKEN_CACHE.get(key)
+    if cached is not None:
+        payload, cached_until = cached
+        if cached_until > time.monotonic():
+            return payload
+        del _TOKEN_CACHE[key]
+
+    payload = jwt.decode(token, _SECRET_BYTES, algorithms=[ALGORITHM])
+    expire = payload.get('exp')
+    if expire is not None:
+        ttl = min(TOKEN_CACHE_TTL, expire - time.time())
+        if ttl > 0:
+            if len(_TOKEN_CACHE) >= TOKEN_CACHE_MAXSIZE:
+                _TOKEN_CACHE.pop(next(iter(_TOKEN_CACHE)))  # Удаляем самую старую запись
+            _TOKEN_CACHE[key] = (payload, time.monotonic() + ttl)
+    return payload
+
+
+def _bearer(authorization: Annotated[str | None, Header()] = None) -> str:
+    """
+    Извлекает Bearer-токен из заголовка Authorization.
+    """
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
+
+async def get_current_user(token: Annotated[str, Depends(_bearer)]) -> CurrentUser:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         username: str = payload.get('sub')
         user_id: int = payload.get('id')
         is_admin: bool = payload.get('is_admin')
@@ -31,37 +97,48 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail='Доступ запрещен. Необходимы права администратора.'
             )
-        if expire is None or datetime.fromtimestamp(expire, timezone.utc) < datetime.now(timezone.utc):
+        if expire is None or expire < time.time():
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token expired or not supplied!"
             )
-        return {
-            'username': username,
-            'id': user_id,
-            'is_admin': is_admin
-        }
-    except ExpiredSignatureError:
+        return CurrentUser(username=username, id=user_id, is_admin=is_admin)
+    except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token expired!"
         )
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate user'
         )
 
 
-async def create_access_token(username: str, user_id: int, is_role: str, is_admin: bool, expires_delta: timedelta):
+def create_access_token(username: str, user_id: int, is_role: str, is_admin: bool, expires_delta: timedelta):
     encode = {'sub': username, 'id': user_id, 'is_role': is_role, 'is_admin': is_admin}
-    expires = datetime.now(timezone.utc) + expires_delta
+    expires = int(time.time() + expires_delta.total_seconds())
     encode.update({"exp": expires})
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(encode, _SECRET_BYTES, algorithm=ALGORITHM)
+
 
+async def verify_password(password: str, hashed_password: str) -> bool:
+    """
+    Проверяет пароль в отдельном потоке, не блокируя цикл событий.
+    """
+    return await asyncio.to_thread(pwd_context.verify, password, hashed_password)
 
-async def authenticate_user(db: Annotated[AsyncSession, Depends(get_db)], username: str, password: str):
-    user = await db.scalar(select(User).where(User.name == username))
+
+async def authenticate(
+        db: Annotated[AsyncSession, Depends(get_db)],
+        username: str,
+        password: str,
+        require_admin: bool = False
+):
+    # Самый частый запрос сервиса выполняем напрямую через asyncpg, минуя компиляцию SQLAlchemy
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    user = await raw_connection.driver_connection.fetchrow(_USER_BY_NAME_SQL, username)
     if not user:  # Проверяем, существует ли пользователь
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,35 +146,25 @@ async def authenticate_user(db: Annotated[AsyncSession, Depends(get_db)], userna
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user.is_admin:  # Проверяем, является ли пользователь администратором
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Доступ запрещен. Необходимы права администратора.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    if not bcrypt_context.verify(password, user.password):  # Проверяем пароль
+    if user['password'] == PENDING_PASSWORD_HASH:  # Проверяем, завершена ли регистрация
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Неверные учетные данные",
+            detail="Регистрация пользователя еще не завершена, повторите попытку позже",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return user
-
-
-async def authenticate_normal_user(db: Annotated[AsyncSession, Depends(get_db)], username: str, password: str):
-    user = await db.scalar(select(User).where(User.name == username))
-    if not user:  # Проверяем, существует ли пользователь
+    if require_admin and not user['is_admin']:  # Проверяем, является ли пользователь администратором
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пользователь не найден",
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступ запрещен. Необходимы права администратора.",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not bcrypt_context.verify(password, user.password):  # Проверяем пароль
+
+    if not await verify_password(password, user['password']):  # Проверяем пароль
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверные учетные данные",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
     return user
@@ -0,0 +1,23 @@
+from fastapi_cache import FastAPICache
+
+import loguru
+
+ALL_USERS_CACHE_NAMESPACE = 'all_users'
+
+
+def all_users_key_builder(func, namespace: str = '', *, request=None, response=None, args=(), kwargs=None):
+    """
+    Строит ключ кэша для списка пользователей только по параметрам пагинации.
+    """
+    return f"{namespace}:{kwargs['skip']}:{kwargs['limit']}"
+
+
+async def invalidate_users_cache():
+    """
+    Сбрасывает кэш списка пользователей после изменения данных.
+    Ошибка кэша не должна влиять на уже зафиксированную транзакцию, поэтому она только логируется.
+    """
+    try:
+        await FastAPICache.clear(namespace=ALL_USERS_CACHE_NAMESPACE)
+    except Exception as e:
+        loguru.logger.error(f"Не удалось сбросить кэш списка пользователей: {e}")
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import DeclarativeBase
 import loguru
 
@@ -11,22 +11,59 @@ DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_HOST = os.getenv('DB_HOST')
 DB_PORT = os.getenv('DB_PORT')
+ECHO_SQL = os.getenv('ECHO_SQL', 'false').lower() in ('1', 'true', 'yes')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_async_engine(DATABASE_URL, echo=True)
 
-SessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
-async def check_connection():
+def create_engine() -> AsyncEngine:
+    """
+    Создает асинхронный движок базы данных с пулом соединений.
+    Должен вызываться внутри запущенного цикла событий (lifespan приложения),
+    чтобы пул asyncpg был привязан к нему.
+    Возвращает:
+        AsyncEngine: Асинхронный движок SQLAlchemy.
+    """
+    return create_async_engine(
+        DATABASE_URL,
+        echo=ECHO_SQL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        connect_args={'statement_cache_size': 1024}
+    )
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """
+    Создает фабрику асинхронных сессий для указанного движка.
+    Параметры:
+        engine (AsyncEngine): Асинхронный движок базы данных.
+    Возвращает:
+        async_sessionmaker: Фабрика сессий.
+    """
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
+
+async def check_connection(engine: AsyncEngine):
     """
     Проверяет подключение к базе данных.
     Устанавливает соединение с базой данных и выполняет
     запрос для проверки работоспособности. Выводит сообщение
     о статусе подключения.
+    Параметры:
+        engine (AsyncEngine): Асинхронный движок базы данных.
     Исключения:
         Exception: Возникает при ошибках подключения к базе данных.
     """
@@ -35,6 +72,8 @@ async def check_connection():
             loguru.logger.info("Подключение к базе данных успешно установлено.")
     except Exception as e:
         loguru.logger.error(f"Ошибка подключения к базе данных: {e}")
+
+
 class Base(DeclarativeBase):
     """
     Базовый класс для моделей SQLAlchemy.
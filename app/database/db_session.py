@@ -1,17 +1,20 @@
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.database.db_connection import SessionLocal
-
 import loguru
 
 
-async def get_db() -> AsyncSession:
+async def get_db(request: Request) -> AsyncSession:
     """
     Асинхронный генератор для получения сессии базы данных.
 
     Используется для управления сессиями базы данных в приложении.
     Генерирует сессию, которая автоматически закрывается в конце блока.
+    Фабрика сессий берется из состояния приложения (создается в lifespan).
+
+    Параметры:
+        request (Request): Текущий запрос.
 
     Возвращает:
         AsyncSession: Асинхронная сессия базы данных.
@@ -19,7 +22,7 @@ async def get_db() -> AsyncSession:
     Исключения:
         SQLAlchemyError: Возникает при ошибках SQLAlchemy.
     """
-    async with SessionLocal() as session:
+    async with request.app.state.SessionLocal() as session:
         try:
             yield session
         except SQLAlchemyError as e:
@@ -1,8 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
 
+from app.database.db_connection import create_engine, create_session_factory
 from app.routers import users, auth
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Создает пул соединений с базой данных и кэш при запуске приложения
+    и закрывает пул при остановке.
+    """
+    engine = create_engine()
+    app.state.engine = engine
+    app.state.SessionLocal = create_session_factory(engine)
+    FastAPICache.init(InMemoryBackend(), prefix='fastapi-cache')
+    yield
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(users.router)
 app.include_router(auth.router)
 @app.get('/')
@@ -1,15 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from app.database.db_connection import Base
 
 
 class User(Base):
     __tablename__ = 'users'
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String)
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True)
-    password = Column(String, default=True)
-    role = Column(String)
-    is_admin = Column(Boolean)
+    password = Column(String, nullable=False)
+    role = Column(String, nullable=False, default='client')
+    is_admin = Column(Boolean, nullable=False, default=False)
+    pending_since = Column(DateTime(timezone=True))  # Время регистрации, пока хэш пароля еще не сохранен
 
 
@@ -1,54 +1,106 @@
+import asyncio
 from datetime import timedelta
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordRequestForm
 
-from sqlalchemy import insert
+from sqlalchemy import insert, update, delete, or_, func
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from starlette import status
 
+import loguru
+
 from app.database.db_session import get_db
 from app.models.user import User
 from app.schemas import CreateUser
-from app.auth_service import authenticate_normal_user, create_access_token, bcrypt_context
+from app.auth_service import (
+    authenticate, create_access_token, pwd_context, PENDING_PASSWORD_HASH, PENDING_REGISTRATION_TTL
+)
+from app.cache import invalidate_users_cache
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 
+async def _finalize_password(session_factory: async_sessionmaker[AsyncSession], user_id: int, password: str):
+    """
+    Хэширует пароль нового пользователя и сохраняет хэш вместо заглушки.
+    Выполняется фоновой задачей после отправки ответа, поэтому открывает собственную сессию.
+    Если сохранить хэш не удалось, незавершенная запись удаляется, чтобы имя и email
+    снова были свободны для регистрации.
+    """
+    try:
+        hashed_password = await asyncio.to_thread(pwd_context.hash, password)
+        async with session_factory() as session, session.begin():
+            result = await session.execute(update(User).where(
+                User.id == user_id,
+                User.password == PENDING_PASSWORD_HASH
+            ).values(password=hashed_password, pending_since=None))
+        if result.rowcount == 0:
+            loguru.logger.error(f"Регистрация пользователя {user_id} потеряна: запись не найдена при сохранении пароля")
+    except Exception as e:
+        loguru.logger.error(f"Не удалось сохранить пароль пользователя {user_id}: {e}")
+        try:
+            async with session_factory() as session, session.begin():
+                await session.execute(delete(User).where(
+                    User.id == user_id,
+                    User.password == PENDING_PASSWORD_HASH
+                ))
+            await invalidate_users_cache()
+        except Exception as e:
+            loguru.logger.error(f"Не удалось удалить незавершенную регистрацию пользователя {user_id}: {e}")
+
+
 @router.post('/')
 async def create_user(
         db: Annotated[AsyncSession, Depends(get_db)],
-        created_user: CreateUser
+        created_user: CreateUser,
+        request: Request,
+        background_tasks: BackgroundTasks
 ):
     """
     Создает нового пользователя.
+    Пароль хэшируется фоновой задачей после ответа, до ее завершения вход невозможен.
+    Брошенная незавершенная регистрация с тем же именем или email удаляется.
     Параметры:
     - db (AsyncSession): Асинхронная сессия базы данных.
     - created_user (CreateUser): Данные для создания пользователя, включая имя, email и пароль.
+    - request (Request): Текущий запрос, из него берется фабрика сессий для фоновой задачи.
+    - background_tasks (BackgroundTasks): Очередь фоновых задач.
     Возвращает:
     - dict: Словарь со статусом и сообщением о результате создания пользователя.
     """
     try:
-        await db.execute(insert(User).values(
-            name=created_user.name,
-            email=created_user.email,
-            password=bcrypt_context.hash(created_user.password),
-            role='client',
-            is_admin=False
-        ))
-        await db.commit()
-        return {
-            'status_code': status.HTTP_201_CREATED,
-            'transaction': 'Пользователь успешно создан'
-        }
+        async with db.begin():  # Транзакция фиксируется при выходе и откатывается при ошибке
+            # Регистрация, брошенная дольше PENDING_REGISTRATION_TTL назад (например, из-за перезапуска воркера),
+            # не должна навсегда занимать имя и email. Более свежие записи не трогаем: их хэш еще может сохраняться
+            await db.execute(delete(User).where(
+                User.password == PENDING_PASSWORD_HASH,
+                User.pending_since < func.now() - PENDING_REGISTRATION_TTL,
+                or_(User.name == created_user.name, User.email == created_user.email)
+            ))
+            user_id = await db.scalar(insert(User).values(
+                name=created_user.name,
+                email=created_user.email,
+                password=PENDING_PASSWORD_HASH,
+                pending_since=func.now(),
+                role='client',
+                is_admin=False
+            ).returning(User.id))
     except IntegrityError:
-        await db.rollback()
         return {'transaction': 'Пользователь с таким именем или email уже существует'}
     except Exception as e:
         return {'transaction': f'Ошибка: {str(e)}'}
+    background_tasks.add_task(
+        _finalize_password, request.app.state.SessionLocal, user_id, created_user.password
+    )
+    await invalidate_users_cache()
+    return {
+        'status_code': status.HTTP_201_CREATED,
+        'transaction': 'Пользователь успешно создан'
+    }
 
 
 @router.post('/token')
@@ -64,9 +116,9 @@ async def login(
     Возвращает:
     - dict: Словарь с токеном доступа и типом токена.
     """
-    user = await authenticate_normal_user(db, form_data.username, form_data.password)
-    token = await create_access_token(user.name, user.id, user.role, user.is_admin,
-                                      expires_delta=timedelta(minutes=20))
+    user = await authenticate(db, form_data.username, form_data.password)
+    token = create_access_token(user['name'], user['id'], user['role'], user['is_admin'],
+                                expires_delta=timedelta(minutes=20))
     return {
         'access_token': token,
         'token_type': 'bearer'
@@ -1,12 +1,14 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, insert, update
+from fastapi_cache.decorator import cache
+from sqlalchemy import select, insert, update, delete
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.auth_service import get_current_user
+from app.auth_service import get_current_user, CurrentUser
+from app.cache import ALL_USERS_CACHE_NAMESPACE, all_users_key_builder, invalidate_users_cache
 from app.database.db_session import get_db
 from app.models.user import User
 from app.schemas import ViewsUser, UserResponse, CreateUser, UpdateUser
@@ -15,9 +17,10 @@ router = APIRouter(prefix='/user', tags=['User'])
 
 
 @router.get('/all', response_model=list[ViewsUser])
+@cache(expire=10, namespace=ALL_USERS_CACHE_NAMESPACE, key_builder=all_users_key_builder)
 async def all_users(
         db: Annotated[AsyncSession, Depends(get_db)],
-        current_user: Annotated[dict, Depends(get_current_user)],
+        current_user: Annotated[CurrentUser, Depends(get_current_user)],
         skip: int = Query(0, ge=0),  # Параметр для пропуска пользователей
         limit: int = Query(10, gt=0)  # Параметр для ограничения количества пользователей
 ):
@@ -26,7 +29,7 @@ async def all_users(
 
     Параметры:
     - db (AsyncSession): Асинхронная сессия базы данных.
-    - current_user (dict): Данные текущего пользователя, полученные из зависимостей.
+    - current_user (CurrentUser): Данные текущего пользователя, полученные из зависимостей.
     - skip (int): Количество пользователей, которые нужно пропустить (по умолчанию 0).
     - limit (int): Максимальное количество пользователей для возврата (по умолчанию 10).
 
@@ -36,10 +39,10 @@ async def all_users(
     Исключения:
     - HTTPException: Если текущий пользователь не является администратором (403).
     """
-    if current_user.get('is_admin'):
-        users_query = select(User).offset(skip).limit(limit)
+    if current_user.is_admin:
+        users_query = select(User.id, User.name, User.email).offset(skip).limit(limit)
         users = await db.execute(users_query)
-        return users.scalars().all()
+        return [user._asdict() for user in users]  # Словари сериализуются в кэш без потерь
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -51,7 +54,7 @@ async def all_users(
 async def create_user(
         db: Annotated[AsyncSession, Depends(get_db)],
         created_user: CreateUser,
-        get_user: Annotated[dict, Depends(get_current_user)]
+        get_user: Annotated[CurrentUser, Depends(get_current_user)]
 ):
     """
     Создает нового пользователя.
@@ -59,7 +62,7 @@ async def create_user(
     Параметры:
     - db (AsyncSession): Асинхронная сессия базы данных.
     - created_user (CreateUser ): Данные для создания пользователя.
-    - get_user (dict): Данные текущего пользователя, полученные из зависимостей.
+    - get_user (CurrentUser): Данные текущего пользователя, полученные из зависимостей.
 
     Возвращает:
     - dict: Словарь с статусом и сообщением о результате создания пользователя.
@@ -67,13 +70,14 @@ async def create_user(
     Исключения:
     - HTTPException: Если текущий пользователь не является администратором (401).
     """
-    if get_user.get('is_admin'):
-        await db.execute(insert(User).values(
-            name=created_user.name,
-            email=created_user.email,
-            password=created_user.password
-        ))
-        await db.commit()
+    if get_user.is_admin:
+        async with db.begin():
+            await db.execute(insert(User).values(
+                name=created_user.name,
+                email=created_user.email,
+                password=created_user.password
+            ))
+        await invalidate_users_cache()
         return {
             'status_code': status.HTTP_201_CREATED,
             'message': "Пользователь успешно создан!",
@@ -93,7 +97,7 @@ async def update_user(
         db: Annotated[AsyncSession, Depends(get_db)],
         user_id: int,
         updated_user: UpdateUser,
-        current_user: Annotated[dict, Depends(get_current_user)]
+        current_user: Annotated[CurrentUser, Depends(get_current_user)]
 ):
     """
     Обновляет роль пользователя по его ID.
@@ -102,7 +106,7 @@ async def update_user(
     - db (AsyncSession): Асинхронная сессия базы данных.
     - user_id (int): ID пользователя, роль которого нужно обновить.
     - updated_user (UpdateUser ): Данные для обновления роли пользователя.
-    - current_user (dict): Данные текущего пользователя, полученные из зависимостей.
+    - current_user (CurrentUser): Данные текущего пользователя, полученные из зависимостей.
 
     Возвращает:
     - dict: Словарь с сообщением об успешном обновлении пользователя.
@@ -110,18 +114,18 @@ async def update_user(
     Исключения:
     - HTTPException: Если текущий пользователь не является администратором (403) или пользователь не найден (404).
     """
-    if current_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Пользователь не найден'
-            )
-        await db.execute(update(User).where(User.id == user_id).values(
-            role=updated_user.role,
-            is_admin=updated_user.is_admin  # Обновление is_admin, если это необходимо
-        ))
-        await db.commit()
+    if current_user.is_admin:
+        async with db.begin():
+            result = await db.execute(update(User).where(User.id == user_id).values(
+                role=updated_user.role,
+                is_admin=updated_user.is_admin  # Обновление is_admin, если это необходимо
+            ).returning(User.id))
+            if result.first() is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail='Пользователь не найден'
+                )
+        await invalidate_users_cache()
         return {
             'transaction': 'Пользователь успешно обновлен'
         }
@@ -136,7 +140,7 @@ async def update_user(
 async def delete_user(
         db: Annotated[AsyncSession, Depends(get_db)],
         user_id: int,
-        current_user: Annotated[dict, Depends(get_current_user)]
+        current_user: Annotated[CurrentUser, Depends(get_current_user)]
 ):
     """
     Удаляет пользователя по его ID.
@@ -144,7 +148,7 @@ async def delete_user(
     Параметры:
     - db (AsyncSession): Асинхронная сессия базы данных.
     - user_id (int): ID пользователя, которого нужно удалить.
-    - current_user (dict): Данные текущего пользователя, полученные из зависимостей.
+    - current_user (CurrentUser): Данные текущего пользователя, полученные из зависимостей.
 
     Возвращает:
     - dict: Словарь с сообщением об успешном удалении пользователя.
@@ -152,15 +156,15 @@ async def delete_user(
     Исключения:
     - HTTPException: Если текущий пользователь не является администратором (403) или пользователь не найден (404).
     """
-    if current_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail='Пользователь не найден'
-            )
-        await db.delete(user)
-        await db.commit()
+    if current_user.is_admin:
+        async with db.begin():
+            result = await db.execute(delete(User).where(User.id == user_id))
+            if result.rowcount == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail='Пользователь не найден'
+                )
+        await invalidate_users_cache()
         return {
             'status_code': status.HTTP_200_OK,
             'transaction': 'Пользователь успешно удален'